@@ -2,6 +2,7 @@
 Custom integration to integrate Dahua cameras with Home Assistant.
 """
 import asyncio
+import dataclasses
 from typing import Any, Dict
 import logging
 import ssl
@@ -37,6 +38,7 @@ from .const import (
     CONF_CHANNEL,
 )
 from .dahua_utils import parse_event
+from .models import CoaxialControlIOStatus
 from .vto import DahuaVTOClient
 
 SCAN_INTERVAL_SECONDS = timedelta(seconds=30)
@@ -106,7 +108,12 @@ class DahuaDataUpdateCoordinator(DataUpdateCoordinator):
         ssl_context.set_ciphers("DEFAULT")
         ssl_context.check_hostname = False
         ssl_context.verify_mode = ssl.CERT_NONE
-        connector = TCPConnector(enable_cleanup_closed=True, ssl=ssl_context)
+        # One session (and connection pool) is shared by every client for this device so the TCP/TLS handshake is
+        # reused across the many small requests made per poll. The event stream holds one connection open for good,
+        # so leave enough headroom per host for the fan out in _async_update_data. The keepalive stays at aiohttp's
+        # 15 second default: aiohttp won't retry a POST on a pooled socket the camera has already closed, so idle
+        # connections must be dropped before the device drops them.
+        connector = TCPConnector(limit_per_host=8, enable_cleanup_closed=True, ssl=ssl_context)
         self._session = ClientSession(connector=connector)
 
         # The client used to communicate with Dahua devices
@@ -192,13 +199,18 @@ class DahuaDataUpdateCoordinator(DataUpdateCoordinator):
         # Do the one time initialization (do this when Home Assistant starts)
         if not self.initialized:
             try:
+                # These calls don't depend on each other so fan them out
+                max_extra_streams, machine_name, sys_info, version = await asyncio.gather(
+                    self.client.get_max_extra_streams(),
+                    self.client.async_get_machine_name(),
+                    self.client.async_get_system_info(),
+                    self.client.get_software_version(),
+                )
+
                 # Find the max number of streams. 1 main stream + n number of sub-streams
-                self._max_streams = await self.client.get_max_extra_streams() + 1
+                self._max_streams = max_extra_streams + 1
                 _LOGGER.info("Using max streams %s", self._max_streams)
 
-                machine_name = await self.client.async_get_machine_name()
-                sys_info = await self.client.async_get_system_info()
-                version = await self.client.get_software_version()
                 data.update(machine_name)
                 data.update(sys_info)
                 data.update(version)
@@ -613,6 +625,27 @@ class DahuaDataUpdateCoordinator(DataUpdateCoordinator):
         
         
 
+    def set_coaxial_control_io_state(self, speaker: bool = None, white_light: bool = None):
+        """
+        Updates the cached speaker and white light state (as returned by coaxialControlIO.cgi?action=getStatus) after
+        we've changed it on the device, so entities update without waiting for the next poll. Listeners are only
+        notified if the state actually changed
+        """
+        if self.data is None:
+            return
+        current = CoaxialControlIOStatus(speaker=self.is_siren_on(), white_light=self.is_security_light_on())
+        changes = {}
+        if speaker is not None:
+            changes["speaker"] = speaker
+        if white_light is not None:
+            changes["white_light"] = white_light
+        status = dataclasses.replace(current, **changes)
+        if status == current:
+            return
+        self.data["status.status.Speaker"] = "On" if status.speaker else "Off"
+        self.data["status.status.WhiteLight"] = "On" if status.white_light else "Off"
+        self.async_update_listeners()
+
     def is_siren_on(self) -> bool:
         """ Returns true if the camera siren is on """
         return self.data.get("status.status.Speaker", "").lower() == "on"
@@ -9,9 +9,8 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .entity import DahuaBaseEntity
-from .const import DOMAIN
+from .const import DOMAIN, SIREN_ICON, SECURITY_LIGHT_ICON
 from . import DahuaDataUpdateCoordinator
-from .const import *
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -22,49 +21,39 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up custom button entities based on a config entry."""
-    coordinator: DahuaDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
-    
-    entities = [
-        TriggerLightButton(coordinator, entry),
-        TriggerSirenButton(coordinator, entry)
-    ]
+    domain_data = hass.data[DOMAIN]
+    coordinator: DahuaDataUpdateCoordinator = domain_data[entry.entry_id]
 
-    async_add_entities(entities)
+    async_add_entities((
+        TriggerLightButton(coordinator, entry),
+        TriggerSirenButton(coordinator, entry),
+    ))
 
 class TriggerSirenButton(DahuaBaseEntity, ButtonEntity):
     """Defines a custom button."""
 
+    def __init__(self, coordinator: DahuaDataUpdateCoordinator, config_entry):
+        super().__init__(coordinator, config_entry)
+        self._attr_name = f"{coordinator.get_device_name()} Trigger Siren"
+        self._attr_unique_id = f"{coordinator.get_serial_number()}_trigger_siren"
+        self._attr_icon = SIREN_ICON
+
     async def async_press(self) -> None:
         """Press the button."""
-        await self._coordinator.client.toggle_siren()
-        
-    @property
-    def name(self):
-        return self._coordinator.get_device_name() + " " + "Trigger Siren"
+        if await self._coordinator.client.toggle_siren():
+            self._coordinator.set_coaxial_control_io_state(speaker=True)
 
-    @property
-    def unique_id(self):
-        return self._coordinator.get_serial_number() + "_trigger_siren"
 
-    @property
-    def icon(self):
-        return SIREN_ICON
-    
 class TriggerLightButton(DahuaBaseEntity, ButtonEntity):
     """Defines a custom button."""
 
+    def __init__(self, coordinator: DahuaDataUpdateCoordinator, config_entry):
+        super().__init__(coordinator, config_entry)
+        self._attr_name = f"{coordinator.get_device_name()} Trigger Light"
+        self._attr_unique_id = f"{coordinator.get_serial_number()}_trigger_light"
+        self._attr_icon = SECURITY_LIGHT_ICON
+
     async def async_press(self) -> None:
         """Press the button."""
-        await self._coordinator.client.toggle_light()
-        
-    @property
-    def name(self):
-        return self._coordinator.get_device_name() + " " + "Trigger Light"
-
-    @property
-    def unique_id(self):
-        return self._coordinator.get_serial_number() + "_trigger_light"
-
-    @property
-    def icon(self):
-        return SECURITY_LIGHT_ICON
\ No newline at end of file
+        if await self._coordinator.client.toggle_light():
+            self._coordinator.set_coaxial_control_io_state(white_light=True)
@@ -5,7 +5,6 @@ import asyncio
 import aiohttp
 import async_timeout
 from .rpc2 import DahuaRpc2Client
-from.models import CoaxialControlIOStatus
 from .digest import DigestAuth
 from hashlib import md5
 
@@ -800,19 +799,15 @@ class DahuaClient:
 			_LOGGER.warning("Exception fetching information from %s", url)
 			raise exception
 
-	async def toggle_light(self):
-		response: CoaxialControlIOStatus = await self.rpc2_client.set_coaxial_control_io_status(0, 1, 1, 2)
-		if response.white_light == True:
-			return True
-		else:
-			_LOGGER.warning("Error turning light on")
+	async def toggle_light(self) -> bool:
+		""" Turns the white light on. Raises if the device rejects the request """
+		await self.rpc2_client.set_coaxial_control_io_status(0, 1, 1, 2)
+		return True
 
-	async def toggle_siren(self):
-		response: CoaxialControlIOStatus = await self.rpc2_client.set_coaxial_control_io_status(0, 2, 1, 2)
-		if response.speaker == True:
-			return True
-		else:
-			_LOGGER.warning("Error turning siren on")
+	async def toggle_siren(self) -> bool:
+		""" Turns the siren on. Raises if the device rejects the request """
+		await self.rpc2_client.set_coaxial_control_io_status(0, 2, 1, 2)
+		return True
 
 
 	async def post(self, url: str, payload: dict) -> dict:
@@ -20,6 +20,8 @@ class DahuaBaseEntity(CoordinatorEntity):
     @property
     def unique_id(self):
         """Return a unique ID to use for this entity."""
+        if self._attr_unique_id is not None:
+            return self._attr_unique_id
         return self._coordinator.get_serial_number()
 
     # https://developers.home-assistant.io/docs/device_registry_index
@@ -1,14 +1,13 @@
-from dataclasses import dataclass, InitVar
-from typing import Any
+from dataclasses import dataclass
 
 
-@dataclass(unsafe_hash=True)
+@dataclass(slots=True, frozen=True)
 class CoaxialControlIOStatus:
     speaker: bool = False
     white_light: bool = False
-    api_response: InitVar[Any] = None
 
-    def __post_init__(self, api_response):
-        if api_response is not None:
-            self.speaker = api_response["params"]["status"]["Speaker"] == "On"
-            self.white_light = api_response["params"]["status"]["WhiteLight"] == "On"
+    @classmethod
+    def from_api_response(cls, api_response: dict) -> "CoaxialControlIOStatus":
+        """Builds the status from a CoaxialControlIO.getStatus RPC2 response."""
+        status = api_response["params"]["status"]
+        return cls(speaker=status["Speaker"] == "On", white_light=status["WhiteLight"] == "On")
@@ -1,30 +1,47 @@
 import aiohttp
-import json
+import asyncio
 import hashlib
+import itertools
 import logging
 import sys
-from dataclasses import dataclass
-from typing import Any
+from yarl import URL
+
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+from .models import CoaxialControlIOStatus
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
+# How long a login is trusted before we log in again. Dahua drops idle sessions after roughly 60 seconds.
+SESSION_TTL_SECONDS = 50
+
+# Error code returned when the request's session is unknown to the device, e.g. it expired
+INVALID_SESSION_ERROR_CODE = 287637505
+
+# CoaxialControlIO.control Type and IO values
+COAXIAL_TYPE_WHITE_LIGHT = 1
+COAXIAL_TYPE_SPEAKER = 2
+COAXIAL_IO_ON = 1
+
 if sys.version_info > (3, 0):
     unicode = str
 
 
-@dataclass(unsafe_hash=True)
-class CoaxialControlIOStatus:
-    speaker: bool = False
-    white_light: bool = False
-    api_response: Any = None
-
-    def __post_init__(self):
-        if self.api_response is not None:
-            self.speaker = self.api_response["params"]["status"]["Speaker"] == "On"
-            self.white_light = self.api_response["params"]["status"]["WhiteLight"] == "On"
+class InvalidSessionError(ConnectionError):
+    """Raised when the device rejects a request because its session is no longer valid."""
 
 
 class DahuaRpc2Client:
+    """
+    Client for the Dahua RPC2 JSON API.
+
+    The supplied session is owned by the caller and is reused for the lifetime of the client so that requests share
+    the session's keep-alive connection pool. It is never closed here.
+    """
+
     def __init__(
             self,
             username: str,
@@ -39,76 +56,104 @@ class DahuaRpc2Client:
         self._session = session
         self._rtsp_port = rtsp_port
         self._session_id = None
-        self._id = 0
+        self._id_gen = itertools.count(1)
+        self._session_expires_at = 0.0
+        self._login_lock = asyncio.Lock()
+        self._pwd_hash: bytes | None = None
+        self._cached_realm: str | None = None
         protocol = "https" if port == 443 else "http"
         self._base = f"{protocol}://{address}:{port}"
+        # Parsed once so aiohttp doesn't have to parse the URL on every request
+        self._rpc_url = URL(f"{self._base}/RPC2")
+        self._login_url = URL(f"{self._base}/RPC2_Login")
         self.logged_in = False
-        _LOGGER.debug(f"DahuaRpc2Client initialized with base URL: {self._base}")
+        _LOGGER.debug("DahuaRpc2Client initialized with base URL: %s", self._base)
 
     async def request(self, method, params=None, object_id=None, extra=None, url=None, verify_result=True):
-        """Make an RPC request."""
-        self._id += 1
-        data = {'method': method, 'id': self._id}
+        """Make an RPC request. extra holds any additional top level keys to send with the request."""
+        debug = _LOGGER.isEnabledFor(logging.DEBUG)
+        rpc_id = next(self._id_gen)
+        if extra:
+            data = {**extra, 'method': method, 'id': rpc_id}
+        else:
+            data = {'method': method, 'id': rpc_id}
         if params is not None:
             data['params'] = params
         if object_id:
             data['object'] = object_id
-        if extra is not None:
-            data.update(extra)
         if self._session_id:
             data['session'] = self._session_id
         if not url:
-            url = f"{self._base}/RPC2"
+            url = self._rpc_url
 
-        _LOGGER.debug(f"Requesting {method} with params {params} to URL: {url} Using session: {self._session_id}")
+        if debug:
+            _LOGGER.debug("Requesting %s with params %s to URL: %s Using session: %s", method, params, url,
+                          self._session_id)
 
         try:
-            async with self._session.post(url, data=json.dumps(data)) as resp:
-                text_response = await resp.text()
-                _LOGGER.debug(f"Response Text: {text_response}")
+            async with self._session.post(url, data=_json.dumps(data), headers={"Content-Type": "application/json"}) as resp:
+                raw_response = await resp.read()
+                if debug:
+                    _LOGGER.debug("Response Text: %s", raw_response.decode("utf-8", "replace"))
 
                 try:
-                    resp_json = json.loads(text_response)
-                except json.JSONDecodeError:
-                    _LOGGER.error(f"Failed to decode JSON. Response text: {text_response}")
+                    resp_json = _json.loads(raw_response)
+                except _json.JSONDecodeError:
+                    _LOGGER.error("Failed to decode JSON. Response text: %s",
+                                  raw_response[:512].decode("utf-8", "replace"))
                     raise ValueError("Failed to decode JSON response")
 
                 if verify_result and resp_json.get('result') is False:
-                    _LOGGER.error(f"API call failed: {resp_json}")
+                    error = resp_json.get('error') or {}
+                    if error.get('code') == INVALID_SESSION_ERROR_CODE:
+                        _LOGGER.debug("Session rejected by device: %r", resp_json)
+                        raise InvalidSessionError(f"Invalid session: {resp_json}")
+                    _LOGGER.error("API call failed: %r", resp_json)
                     raise ConnectionError(f"API call failed: {resp_json}")
 
                 return resp_json
+        except InvalidSessionError:
+            raise
         except Exception as e:
-            _LOGGER.error(f"Request failed: {e}")
+            _LOGGER.error("Request failed: %s", e)
             raise
 
     async def login(self):
-        """Dahua RPC login."""
+        """Dahua RPC login. Use _ensure_login so concurrent callers don't start overlapping logins."""
         _LOGGER.debug("Attempting to log in")
+        self.logged_in = False
         self._session_id = None
-        self._id = 0
-        url = '{0}/RPC2_Login'.format(self._base)
+        self._id_gen = itertools.count(1)
+        url = self._login_url
         method = "global.login"
         params = {'userName': self._username,
                   'password': "",
                   'clientType': "Dahua3.0-Web3.0"}
 
         r = await self.request(method=method, params=params, url=url, verify_result=False)
-        _LOGGER.debug(f"Initial login response: {r}")
+        _LOGGER.debug("Initial login response: %s", r)
 
         self._session_id = r['session']
-        realm = r['params']['realm']
-        random = r['params']['random']
+        login_params = r['params']
+        realm = login_params['realm']
+        random = login_params['random']
 
-        _LOGGER.debug(f"Received session: {self._session_id}, realm: {realm}, random: {random}")
+        _LOGGER.debug("Received session: %s, realm: %s, random: %s", self._session_id, realm, random)
 
-        # Password encryption algorithm
-        pwd_phrase = f"{self._username}:{realm}:{self._password}"
-        pwd_hash = hashlib.md5(pwd_phrase.encode('utf-8')).hexdigest().upper()
-        pass_phrase = f"{self._username}:{random}:{pwd_hash}"
-        pass_hash = hashlib.md5(pass_phrase.encode('utf-8')).hexdigest().upper()
+        # Password encryption algorithm. The inner hash only depends on the realm (fixed per device) and our
+        # credentials (fixed per client), so it's cached against the realm it was computed for
+        user_b = self._username.encode('utf-8')
+        if self._pwd_hash is not None and self._cached_realm == realm:
+            pwd_hash = self._pwd_hash
+        else:
+            pwd_phrase = b"%s:%s:%s" % (user_b, realm.encode('utf-8'), self._password.encode('utf-8'))
+            pwd_hash = hashlib.md5(pwd_phrase, usedforsecurity=False).hexdigest().upper().encode('ascii')
+            self._pwd_hash = pwd_hash
+            self._cached_realm = realm
+        pass_phrase = b"%s:%s:%s" % (user_b, random.encode('utf-8'), pwd_hash)
+        pass_hash = hashlib.md5(pass_phrase, usedforsecurity=False).hexdigest().upper()
 
-        _LOGGER.debug(f"Password hash: {pass_hash}")
+        _LOGGER.debug("Password hash: %s", pass_hash)
 
         params = {'userName': self._username,
                   'password': pass_hash,
@@ -117,23 +162,49 @@ class DahuaRpc2Client:
                   'passwordType': "Default"}
 
         response = await self.request(method=method, params=params, url=url)
-        _LOGGER.debug(f"Final login response: {response}")
+        _LOGGER.debug("Final login response: %s", response)
 
-        if response.get("result") == True:
+        if response.get("result") is True:
             self.logged_in = True
-            self._session
-            _LOGGER.info(f"Login successful. Device Time: {await self.current_time()}")
+            self._session_expires_at = asyncio.get_running_loop().time() + SESSION_TTL_SECONDS
+            _LOGGER.debug("Login successful")
             return response
         else:
             _LOGGER.error("Login failed")
             return False
 
+    def _has_valid_session(self) -> bool:
+        return self.logged_in and asyncio.get_running_loop().time() < self._session_expires_at
+
+    async def _ensure_login(self):
+        """Logs in unless we already hold a session that hasn't expired."""
+        if self._has_valid_session():
+            return
+        async with self._login_lock:
+            # Another caller may have logged in while we waited for the lock
+            if not self._has_valid_session():
+                await self.login()
+
+    async def _request_with_login(self, method, params=None):
+        """Make an RPC request on a logged in session, logging in again once if the device rejected the session."""
+        await self._ensure_login()
+        session_id = self._session_id
+        try:
+            return await self.request(method=method, params=params)
+        except InvalidSessionError:
+            _LOGGER.debug("%s was rejected because the session expired. Logging in again", method)
+            # Only drop the session if a concurrent caller hasn't already replaced it
+            if self._session_id == session_id:
+                self.logged_in = False
+            await self._ensure_login()
+            return await self.request(method=method, params=params)
+
     async def logout(self) -> bool:
         """Logs out of the current session."""
         _LOGGER.debug("Attempting to log out")
         try:
             response = await self.request(method="global.logout")
-            _LOGGER.debug(f"Logout response: {response}")
+            _LOGGER.debug("Logout response: %s", response)
             if response.get('result') is True:
                 _LOGGER.info("Logout successful")
                 return True
@@ -141,50 +212,53 @@ class DahuaRpc2Client:
                 _LOGGER.debug("Failed to log out")
                 return False
         except Exception as e:
-            _LOGGER.error(f"Logout failed: {e}")
+            _LOGGER.error("Logout failed: %s", e)
             return False
 
     async def current_time(self):
         """Get the current time on the device."""
         _LOGGER.debug("Fetching current time")
         response = await self.request(method="global.getCurrentTime")
-        _LOGGER.debug(f"Current time response: {response}")
+        _LOGGER.debug("Current time response: %s", response)
         return response['params']['time']
 
     async def get_serial_number(self) -> str:
         """Gets the serial number of the device."""
         _LOGGER.debug("Fetching serial number")
         response = await self.request(method="magicBox.getSerialNo")
-        _LOGGER.debug(f"Serial number response: {response}")
+        _LOGGER.debug("Serial number response: %s", response)
         return response['params']['sn']
 
     async def get_config(self, params):
         """Gets config for the supplied params."""
-        _LOGGER.debug(f"Fetching config with params: {params}")
+        _LOGGER.debug("Fetching config with params: %s", params)
         response = await self.request(method="configManager.getConfig", params=params)
-        _LOGGER.debug(f"Config response: {response}")
+        _LOGGER.debug("Config response: %s", response)
         return response['params']
 
     async def get_device_name(self) -> str:
         """Get the device name."""
         _LOGGER.debug("Fetching device name")
         data = await self.get_config({"name": "General"})
-        _LOGGER.debug(f"Device name config: {data}")
+        _LOGGER.debug("Device name config: %s", data)
         return data["table"]["MachineName"]
 
     async def get_coaxial_control_io_status(self, channel: int) -> CoaxialControlIOStatus:
         """Returns the current state of the speaker and white light."""
-        await self.login()
-        _LOGGER.debug(f"Fetching coaxial control IO status for channel: {channel}")
-        response = await self.request(method="CoaxialControlIO.getStatus", params={"channel": channel})
-        _LOGGER.debug(f"Coaxial control IO status response: {response}")
-        return CoaxialControlIOStatus(api_response=response)
-
+        _LOGGER.debug("Fetching coaxial control IO status for channel: %s", channel)
+        response = await self._request_with_login(method="CoaxialControlIO.getStatus", params={"channel": channel})
+        _LOGGER.debug("Coaxial control IO status response: %s", response)
+        return CoaxialControlIOStatus.from_api_response(response)
 
     async def set_coaxial_control_io_status(self, channel: int, type: int, io: int, trigger_mode: int) -> CoaxialControlIOStatus:
-        """Controls the current state of the speaker and white light."""
-        await self.login()
-        _LOGGER.debug(f"Setting coaxial control IO status for channel: {channel}, type: {type}, io: {io}, trigger_mode: {trigger_mode}")
-        await self.request(method="CoaxialControlIO.control", params={"channel": channel, "info": [{"Type": type, "IO": io, "TriggerMode": trigger_mode}]})
-        _LOGGER.debug("Coaxial control IO status set, fetching updated status")
-        return await self.get_coaxial_control_io_status(channel)
+        """
+        Controls the current state of the speaker and white light.
+
+        The returned status is derived from the request rather than read back from the device, so only the output
+        addressed by type is reflected. Use get_coaxial_control_io_status when the real device state is needed.
+        """
+        _LOGGER.debug("Setting coaxial control IO status for channel: %s, type: %s, io: %s, trigger_mode: %s", channel, type, io, trigger_mode)
+        await self._request_with_login(method="CoaxialControlIO.control", params={"channel": channel, "info": [{"Type": type, "IO": io, "TriggerMode": trigger_mode}]})
+        on = io == COAXIAL_IO_ON
+        return CoaxialControlIOStatus(speaker=on and type == COAXIAL_TYPE_SPEAKER,
+                                      white_light=on and type == COAXIAL_TYPE_WHITE_LIGHT)
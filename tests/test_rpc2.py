@@ -0,0 +1,137 @@
+"""Tests for the dahua RPC2 client."""
+import asyncio
+import json
+
+import pytest
+
+from custom_components.dahua.rpc2 import (
+    COAXIAL_IO_ON,
+    COAXIAL_TYPE_SPEAKER,
+    COAXIAL_TYPE_WHITE_LIGHT,
+    INVALID_SESSION_ERROR_CODE,
+    DahuaRpc2Client,
+)
+
+
+class MockResponse:
+    def __init__(self, body: dict):
+        self._body = json.dumps(body).encode("utf-8")
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class MockSession:
+    """Stands in for aiohttp.ClientSession. handler maps each decoded request payload to a response dict."""
+
+    def __init__(self, handler):
+        self._handler = handler
+        self.requests = []
+
+    def post(self, url, data=None, headers=None):
+        payload = json.loads(data)
+        self.requests.append(payload)
+        return MockResponse(self._handler(payload))
+
+
+def login_handler(session_id: str):
+    """Answers the two step global.login handshake with the supplied session id."""
+
+    def handle(payload: dict) -> dict:
+        if payload["params"]["password"] == "":
+            return {"id": payload["id"], "result": False, "session": session_id,
+                    "params": {"realm": "Login to test", "random": "12345"}}
+        return {"id": payload["id"], "result": True, "session": session_id}
+
+    return handle
+
+
+def create_client(handler) -> DahuaRpc2Client:
+    return DahuaRpc2Client("admin", "password", "127.0.0.1", 80, 554, MockSession(handler))
+
+
+def coaxial_handler(session_ids: list, counts: dict, control_response=None):
+    """
+    Logs in with each of session_ids in turn and answers CoaxialControlIO.control. counts tracks the number of
+    logins and control requests. control_response, if set, builds the response to each control request.
+    """
+    sessions = iter(session_ids)
+    login = None
+
+    def handle(payload: dict) -> dict:
+        nonlocal login
+        if payload["method"] == "global.login":
+            if payload["params"]["password"] == "":
+                counts["login"] += 1
+                login = login_handler(next(sessions))
+            return login(payload)
+        counts["control"] += 1
+        if control_response is not None:
+            return control_response(payload)
+        return {"id": payload["id"], "result": True}
+
+    return handle
+
+
+async def test_coaxial_calls_reuse_the_login():
+    """Coaxial calls share one login, including calls made at the same time."""
+    counts = {"login": 0, "control": 0}
+    client = create_client(coaxial_handler(["session1"], counts))
+
+    await asyncio.gather(
+        client.set_coaxial_control_io_status(0, COAXIAL_TYPE_WHITE_LIGHT, COAXIAL_IO_ON, 2),
+        client.set_coaxial_control_io_status(0, COAXIAL_TYPE_SPEAKER, COAXIAL_IO_ON, 2),
+    )
+    await client.set_coaxial_control_io_status(0, COAXIAL_TYPE_SPEAKER, COAXIAL_IO_ON, 2)
+
+    assert counts == {"login": 1, "control": 3}
+
+
+async def test_coaxial_call_logs_in_again_once_the_session_ttl_passes():
+    """A session older than SESSION_TTL_SECONDS is replaced before the next call."""
+    counts = {"login": 0, "control": 0}
+    client = create_client(coaxial_handler(["session1", "session2"], counts))
+
+    await client.set_coaxial_control_io_status(0, COAXIAL_TYPE_SPEAKER, COAXIAL_IO_ON, 2)
+    client._session_expires_at = asyncio.get_running_loop().time() - 1
+    await client.set_coaxial_control_io_status(0, COAXIAL_TYPE_SPEAKER, COAXIAL_IO_ON, 2)
+
+    assert counts == {"login": 2, "control": 2}
+    assert client._session.requests[-1]["session"] == "session2"
+
+
+async def test_coaxial_call_rejected_by_device_is_not_retried():
+    """A failure that isn't an invalid session is raised without logging in again or resending the write."""
+    counts = {"login": 0, "control": 0}
+    client = create_client(coaxial_handler(
+        ["session1"], counts,
+        lambda payload: {"id": payload["id"], "result": False, "error": {"code": 268632079}}))
+
+    with pytest.raises(ConnectionError):
+        await client.set_coaxial_control_io_status(0, COAXIAL_TYPE_SPEAKER, COAXIAL_IO_ON, 2)
+
+    assert counts == {"login": 1, "control": 1}
+
+
+async def test_coaxial_call_with_invalid_session_logs_in_again_and_resends_once():
+    """A call rejected for an invalid session is sent once more on a new session."""
+    counts = {"login": 0, "control": 0}
+
+    def control_response(payload: dict) -> dict:
+        if payload["session"] == "session1":
+            return {"id": payload["id"], "result": False, "error": {"code": INVALID_SESSION_ERROR_CODE}}
+        return {"id": payload["id"], "result": True}
+
+    client = create_client(coaxial_handler(["session1", "session2"], counts, control_response))
+
+    status = await client.set_coaxial_control_io_status(0, COAXIAL_TYPE_SPEAKER, COAXIAL_IO_ON, 2)
+
+    assert status.speaker
+    assert counts == {"login": 2, "control": 2}
+    assert client._session.requests[-1]["session"] == "session2"